@@ -0,0 +1,12 @@
+#
+# MicroPython firmware manifest - freezes power-control.py as bytecode
+#
+# Build from the MicroPython port directory, e.g.:
+#   cd micropython/ports/esp32
+#   make BOARD=ESP32_GENERIC FROZEN_MANIFEST=<path>/power-control/manifest.py
+#
+# Start it from main.py with: __import__ ("power-control")
+#
+include("$(PORT_DIR)/boards/manifest.py")
+
+freeze(".", "power-control.py")
@@ -35,12 +35,17 @@
 #
 
 import machine
+import micropython
 import gc
+import framebuf
 import os
-import utime as time
+import sys
+from utime import ticks_add, ticks_diff
+from uarray import array
 
 import network
 import usocket as socket
+import uselect as select
 
 import ujson as json
 import ure
@@ -54,12 +59,16 @@ import vga1_16x32 as font
 from oled7segment import *
 
 from poll_looper import PollLooper
+from PID import PID
 
-MACHINE_FREQ = 240000000
+DEBUG = const(0)                        # 1: console diagnostics, compiled out when 0
+
+MACHINE_FREQ = const(240000000)
 
 WIDTH = const(240)
 HEIGHT = const(135)
 ROTATION = const(1)
+SPI_BAUDRATE = const(40000000)          # ST7789, raise toward 80 MHz if the wiring allows
 
 BLACK = st7789.BLACK
 BLUE = st7789.BLUE
@@ -74,25 +83,35 @@ YELLOW = st7789.YELLOW
 BG_COLOR = BLACK
 COLOR = WHITE
 
+#---- st7789 color -> RGB565 pixel bytes as sent to the panel, high byte first
+def rgb565_pixel (color) :
+    return bytes ((color >> 8, color & 0xFF))
+
+BG_PIXEL = rgb565_pixel (BG_COLOR)
+
 my_device_id = "SmokerOne"
 
-MINIMUM_PULSE_WIDTH_MS = 2000
+MINIMUM_PULSE_WIDTH_MS = const(2000)
 
 INITIAL_POWER_LEVEL = 0.0
 
-UDP_PORT = 5010
-WEB_PORT = 5010
+UDP_PORT = const(5010)
+UDP_MESSAGE_SIZE = const(2000)          # Largest UDP command accepted
+UDP_RECEIVE_BUFFER_SIZE = const(8192)   # Socket buffer, absorbs command bursts
+WEB_PORT = const(5010)
 
-STANDBY_TIMEOUT_SECONDS = 300 # 5 min
+STANDBY_TIMEOUT_SECONDS = const(300)    # 5 min
 STANDBY_POWER_LEVEL = 20.0
 
-SHUTDOWN_HOURS = 24
-SHUTDOWN_MINUTES = 0
-SHUTDOWN_SECONDS = 0
+SHUTDOWN_HOURS = const(24)
+SHUTDOWN_MINUTES = const(0)
+SHUTDOWN_SECONDS = const(0)
 
-WATCHDOG_TIMEOUT_MS = 10000     # 10 seconds
+WATCHDOG_TIMEOUT_MS = const(10000)      # 10 seconds
 
-POWER_CONTROL_PIN = 2       # Randomly selected TBD
+GC_COLLECT_TICKS = const(256)           # Polls between forced collections
+
+POWER_CONTROL_PIN = const(2)            # Randomly selected TBD
 
 #---------------------------------------------------------------------------
 # GetCommand
@@ -107,6 +126,7 @@ POWER_CONTROL_PIN = 2       # Randomly selected TBD
 #
 #   Example WEB query string (GET):
 #     'GET /?power_level=42.2 ...
+#     Returns "204 No Content", the form page is only sent for 'GET / ...'
 #     Note: This process may exceed the poll interval
 #
 #---------------------------------------------------------------------------
@@ -122,103 +142,43 @@ class GetCommand :
         
         #---- UDP interface
         self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.s.setsockopt (socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try :
+            self.s.setsockopt (socket.SOL_SOCKET,
+                               socket.SO_RCVBUF,
+                               UDP_RECEIVE_BUFFER_SIZE)
+        except (AttributeError, OSError) :
+            pass                            # Not supported by this port
         self.my_ip = network.WLAN().ifconfig()[0]
-        print (network.WLAN().ifconfig())
-        self.address = socket.getaddrinfo(self.my_ip, udp_port)[0][-1]
-        self.address = ("", udp_port)
+        if DEBUG :
+            print (network.WLAN().ifconfig())
+        self.address = ('0.0.0.0', udp_port)
         self.s.bind(self.address)
         self.s.settimeout(0)
+        self.udp_buffer = bytearray (UDP_MESSAGE_SIZE)   # Reused for every datagram
+        self.udp_view = memoryview (self.udp_buffer)
+        self.udp_requests = []                          # Reused, emptied after each drain
+        #---- set_power_level fast path, skips json.loads
+        self.set_power_level_pattern = ure.compile (r'"method"\s*:\s*"set_power_level"')
+        self.power_level_pattern = ure.compile (r'"power_level"\s*:\s*([0-9.]+)\s*[,}]')
         self.power_settings \
             = self.poller.message_set ("powercontrol",
                                             {"power_level": initial_power_level ,
                                             "last_update_ms": poller.get_current_time_ms ()})
         #---- Web server
         self.web_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.web_socket.setsockopt (socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.tcp_nodelay = getattr (socket, "TCP_NODELAY", None)
         self.web_socket.settimeout (0)
         self.web_socket.bind(('0.0.0.0', web_port))
         self.web_socket.listen(5)
-        self.html_header = 'HTTP/1.1 200 OK\n' \
-                            + 'Content-Type: text/html\n' \
-                            + 'Connection: close\n\n'
-        
-        self.poll_udp = True          # Alternate between UPD and WEB input
-
-    def poll_it (self) :
-        #print ("GetCommand: poll_it")
-        if self.poll_udp :
-            self.poll_udp = False
-            #---- UDP input
-            while True :
-                try :
-                    mess_address = self.s.recvfrom (2000)
-                    #print ("GetC:", mess_address)
-                    message = mess_address[0]
-                    address_port = mess_address [1]
-                    request_json = message.decode ()
-                    request_dict = json.loads (request_json)
-                    #print ("Cmd:", request_dict)
-                    self.process_request (request_dict)
-                except OSError :
-                    #print ("GetC: no data")
-                    break
-        else :
-            self.poll_udp = True
-            #---- Web input
-            #print ("Web Input")
-            #while True :
-            conn = False
-            try :
-                conn, addr = self.web_socket.accept()
-                #print('Got a connection from %s' % str(addr))
-                request = conn.recv(4096)
-                query_params = self.qs_parse (request)
-                #print (query_params)
-                if query_params is None :
-                    return                 # Probably a request for a file
-                if query_params['param_count'] > 0 :
-                    self.set_power_level (query_params)
-                conn.sendall (self.html_header
-                                + self.build_html (self.power_settings['power_level']))
-            except OSError :
-                #print ("Web: no data")
-                pass
-            finally :
-                if conn :
-                    conn.close ()
-
-    def qs_parse(self, request) :
-        parameters = {'param_count' : 0}
-        #print ("qs_parse:", str(request))
-        pattern = '^GET\s+/(\S+)'
-        qs_match = ure.search (pattern, request)    # get the query string
-        if qs_match is None :
-            return parameters                   # probably 1st request
-        qs = qs_match.group(1) \
-             .decode("utf-8") \
-             .replace("+", " ") \
-             .replace("%3F", "?") \
-             .replace("%21", "!")
-        #print (qs)
-        if len (qs) <= 0 :
-            return None                         # empty query
-        if qs[0] == "?" :
-            qs = qs[1:]
-        else :
-            return None                         # query string missing
-        #print (qs)
-        ampersandSplit = qs.split("&")          # split id/value pairs
-        for element in ampersandSplit:          # build id/value dictionary
-            equalSplit = element.split("=")
-            if len (equalSplit) < 2 :
-                equalSplit.append ('')          # missing '='
-            param_id = equalSplit[0].replace("+", " ").replace("%3F", "?").replace("%21", "!")
-            param_val = equalSplit[1].replace("+", " ").replace("%3F", "?").replace("%21", "!")
-            parameters[param_id] = param_val
-            parameters ['param_count'] += 1
-        return parameters                       # return query string dict
-
-    def build_html (self, power_level='') :
-        return '''<html>
+        self.html_header = b'HTTP/1.1 200 OK\n' \
+                            + b'Content-Type: text/html\n' \
+                            + b'Connection: close\n\n'
+        self.no_content_header = b'HTTP/1.1 204 No Content\r\n' \
+                            + b'Connection: close\r\n\r\n'
+        #---- Static page text, the power level goes between prefix and suffix
+        self.html_prefix = ('''<html>
 <head>
 <title>''' + my_device_id + ''' Web Server</title>
 <meta name="viewport" content="width=device-width, initial-scale=1">
@@ -252,46 +212,194 @@ p
 <h1>''' + my_device_id + ''' Web Server</h1> 
 <form>
 <p>
-Power Level<input name="power_level" type="text" value="''' \
-    + "{:.1f}".format (power_level) + '''"/>
+Power Level<input name="power_level" type="text" value="''').encode ()
+        self.html_suffix = b'''"/>
 </p>
 <p>
 <input type="submit" value="Update" />
 </p>
 </form>
 </body></html>'''
+        #---- Poll both sockets, only ready ones are serviced
+        self.socket_poll = select.poll ()
+        self.socket_poll.register (self.s, select.POLLIN)
+        self.socket_poll.register (self.web_socket, select.POLLIN)
+        #---- UDP command dispatch, method name -> handler (params)
+        self.request_methods = {
+            "set_power_level" : self.set_power_level ,
+            "pid_update" : self.pid_update ,
+            "shutdown" : self.request_shutdown
+            }
+
+    def poll_it (self) :
+        #print ("GetCommand: poll_it")
+        for poll_socket, poll_event in self.socket_poll.ipoll (0) :
+            if poll_socket is self.s :
+                self.udp_input ()
+            elif poll_socket is self.web_socket :
+                self.web_input ()
+
+    def udp_input (self) :
+        #---- Drain the socket first, then process
+        requests = self.udp_requests
+        power_level_params = None               # Only the latest level is applied
+        while True :
+            try :
+                message_length = self.s.readinto (self.udp_buffer)
+            except OSError :
+                #print ("GetC: no data")
+                break
+            if not message_length :
+                break                           # None: no data
+            message = bytes (self.udp_view[:message_length])
+            if self.set_power_level_pattern.search (message) is not None :
+                power_level_match = self.power_level_pattern.search (message)
+                if power_level_match is not None :
+                    power_level_params \
+                        = {"power_level" : power_level_match.group (1).decode ()}
+                    continue
+            try :                               # A bad datagram only loses itself
+                request_dict = json.loads (message)
+                #print ("Cmd:", request_dict)
+                if request_dict.get ("method") == "set_power_level" \
+                        and "params" in request_dict :
+                    power_level_params = request_dict["params"]
+                else :
+                    requests.append (request_dict)
+            except Exception as e :
+                if DEBUG :
+                    sys.print_exception (e)
+        for request_dict in requests :
+            try :
+                self.process_request (request_dict)
+            except Exception as e :
+                if DEBUG :
+                    sys.print_exception (e)
+        del requests[:]
+        if power_level_params is not None :
+            try :
+                self.set_power_level (power_level_params)
+            except Exception as e :
+                if DEBUG :
+                    sys.print_exception (e)
+
+    def web_input (self) :
+        #print ("Web Input")
+        while True :                            # Accept every pending connection
+            try :
+                conn, addr = self.web_socket.accept()
+            except OSError :
+                #print ("Web: no data")
+                break
+            #print('Got a connection from %s' % str(addr))
+            try :
+                self.web_request (conn)
+            except Exception as e :
+                if DEBUG :
+                    sys.print_exception (e)
+            finally :
+                conn.close ()
+
+    def web_request (self, conn) :
+        if self.tcp_nodelay is not None :
+            try :
+                conn.setsockopt (socket.IPPROTO_TCP, self.tcp_nodelay, 1)
+            except OSError :
+                pass
+        request = conn.recv(4096)
+        query_params = self.qs_parse (request)
+        #print (query_params)
+        if query_params is None :
+            return                     # Probably a request for a file
+        if query_params['param_count'] > 0 \
+                and self.set_power_level (query_params) :
+            conn.sendall (self.no_content_header)
+            return
+        #---- No level or a rejected one, show the level in effect
+        conn.sendall (self.html_header
+                        + self.build_html (self.power_settings['power_level']))
+
+    def qs_parse(self, request) :
+        parameters = {'param_count' : 0}
+        #print ("qs_parse:", str(request))
+        if not request.startswith (b'GET /') :
+            return parameters                   # probably 1st request
+        qs_end = request.find (b' ', 5)         # end of the query string
+        if qs_end <= 5 :
+            return parameters                   # no query string
+        qs = request[5:qs_end]
+        #print (qs)
+        if not qs.startswith (b'?') :
+            return None                         # query string missing
+        qs = qs[1:]
+        #print (qs)
+        ampersandSplit = qs.split(b"&")         # split id/value pairs
+        for element in ampersandSplit:          # build id/value dictionary
+            equalSplit = element.split(b"=")
+            if len (equalSplit) < 2 :
+                equalSplit.append (b'')         # missing '='
+            param_id = self.qs_unquote (equalSplit[0])
+            param_val = self.qs_unquote (equalSplit[1])
+            parameters[param_id] = param_val
+            parameters ['param_count'] += 1
+        return parameters                       # return query string dict
+
+    def qs_unquote (self, qs_bytes) :
+        # Single pass decode of '+' and '%XX' escapes
+        decoded = bytearray ()
+        qs_length = len (qs_bytes)
+        i = 0
+        while i < qs_length :
+            c = qs_bytes[i]
+            if c == 0x2B :                      # '+'
+                decoded.append (0x20)
+            elif c == 0x25 and i + 2 < qs_length :  # '%XX'
+                try :
+                    decoded.append (int (qs_bytes[i+1:i+3], 16))
+                    i += 2
+                except ValueError :
+                    decoded.append (c)          # not an escape, keep '%'
+            else :
+                decoded.append (c)
+            i += 1
+        return decoded.decode ("utf-8")
+
+    def build_html (self, power_level='') :
+        return self.html_prefix \
+                + "{:.1f}".format (power_level).encode () \
+                + self.html_suffix
 
     def process_request (self, request) :
         #print ("request:", request)
-        if not "jsonrpc" in request :
-            print ("request: 'jsonrpc' missing")
-            return
-        if not "method" in request :
-            print ("request: 'method' missing")
+        method = request.get ("method")
+        params = request.get ("params")
+        if method is None or params is None :
+            if DEBUG :
+                print ("request: 'method' or 'params' missing")
             return
-        if not "params" in request :
-            print ("request: 'params' missing")
-            return
-        if request["method"] == "set_power_level" :
-            result = self.set_power_level (request["params"])
-        elif request["method"] == "pid_update" :
-            rquest ["params"]["temperature_update"] = \
-                "current_temperature" in request ["params"]
-            self.poller.message_set ("pid_settings", request["params"])
-        elif request["method"] == "shutdown" :
-            poller.shutdown ()
+        request_method = self.request_methods.get (method)
+        if request_method is not None :
+            request_method (params)
+
+    def pid_update (self, params) :
+        params["temperature_update"] = "current_temperature" in params
+        self.poller.message_set ("pid_settings", params)
+
+    def request_shutdown (self, params) :
+        self.poller.shutdown ()
 
     def set_power_level (self, params) :
         #print ("set_power_level:", params)
         if not "power_level" in params :
-            return
+            return False
         try :
             #print (new_power_level)
             new_power_level = round (float (params ['power_level']), 1)
             self.poller.message_set ("powercontrol",
                                           {"power_level": new_power_level})
         except :
-            return
+            return False
+        return True
         #self.poller.message_set ("powercontrol",
                                       #{"power_level": new_power_level ,
                                        #"last_update_ms" : poller.get_current_time_ms ()
@@ -307,8 +415,6 @@ Power Level<input name="power_level" type="text" value="''' \
 # PIDControl - 
 #---------------------------------------------------------------------------
 class PIDControl :
-    
-    import PID
 
     def __init__(self,
                  poller ,
@@ -325,7 +431,6 @@ class PIDControl :
         self.pid = None
 #pid.SetPoint=225.0
 #pid.setSampleTime(0.01)
-        self.current_time = current_time
         self.current_temperature = 0.0
         self.pid_settings \
             = self.poller.message_set ("pid_control",
@@ -340,25 +445,32 @@ class PIDControl :
 
     def poll_it (self) :
         #print ("PIDControl: poll_it")
-        if self.last_update_ms == self.pid_settings["last_update_ms"] :
+        pid_settings = self.pid_settings
+        last_update_ms = pid_settings["last_update_ms"]
+        if self.last_update_ms == last_update_ms :
             return                           # No change
-        self.last_update_ms = self.pid_settings["last_update_ms"]
-        if self.pid is None :                # First time
-            print ("pid: initialize")
-            self.pid = PID.PID (P = self.pid_settings ["P"] ,
-                                I = self.pid_settings ["I"] ,
-                                D = self.pid_settings ["D"])
-            self.pid.SetPoint = self.pid_settings ["set_point"]
-        if not self.pid_settings ["temperature_update"] :
+        self.last_update_ms = last_update_ms
+        pid = self.pid
+        if pid is None :                     # First time
+            if DEBUG :
+                print ("pid: initialize")
+            pid = PID (P = pid_settings ["P"] ,
+                       I = pid_settings ["I"] ,
+                       D = pid_settings ["D"])
+            pid.SetPoint = pid_settings ["set_point"]
+            self.pid = pid
+        if not pid_settings ["temperature_update"] :
             return
-        self.pid.update (self.pid_settings ["current_temperature"])
-        print ("pid.output:", self.pid.output)
-        power_level = round (max (min (self.pid.output, 100.0), 0.0), 1)
+        pid.update (pid_settings ["current_temperature"])
+        if DEBUG :
+            print ("pid.output:", pid.output)
+        power_level = round (max (min (pid.output, 100.0), 0.0), 1)
         self.poller.message_set ("powercontrol",
                                      {"power_level" : power_level})
 
     def shutdown (self) :
-        print ("PIDControl: shutdown")
+        if DEBUG :
+            print ("PIDControl: shutdown")
         #---- Shutdown code goes here
 
 # end PIDControl
@@ -375,11 +487,12 @@ class PowerControl :
                  minimum_pulse_ms = MINIMUM_PULSE_WIDTH_MS) :
         self.poller = poller
         self.power_control_pin = machine.Pin (POWER_CONTROL_PIN, machine.Pin.OUT)
-        self.power_level = 50.0    # Should be zero
+        self.power_level_tenths = 500    # 50.0, Should be zero
         self.minimum_pulse_ms = minimum_pulse_ms
+        self.build_pulse_table ()
         self.standby = False
         self.standby_timeout = poller.seconds_to_ms (standby_timeout_seconds)
-        self.standby_power_level = standby_power_level
+        self.standby_power_level_tenths = self.power_level_to_tenths (standby_power_level)
         #
         #---- display globals
         self.bg_color = BG_COLOR
@@ -393,14 +506,6 @@ class PowerControl :
             "bg_color" : self.bg_color ,
             "text" : "Pwr Lvl"
             }
-        display.text(
-            font,
-            self.power_heading_display["text"] ,       # Heading
-            self.power_heading_display["xpos"] ,
-            self.power_heading_display["ypos"] ,
-            self.power_heading_display["color"] ,      # char color
-            self.power_heading_display["bg_color"]     # background color
-            )
         self.heading_1_display = {
             "xpos" : 0 ,
             "ypos" : 34 ,
@@ -408,14 +513,6 @@ class PowerControl :
             "bg_color" : self.bg_color ,
             "text" : "Power"
             }
-        display.text(
-            font,
-            self.heading_1_display["text"] ,       # Heading
-            self.heading_1_display["xpos"] ,
-            self.heading_1_display["ypos"] ,
-            self.heading_1_display["color"] ,      # char color
-            self.heading_1_display["bg_color"]     # background color
-            )
         self.heading_2_display = {
             "xpos" : 0 ,
             "ypos" : 62 ,
@@ -423,21 +520,16 @@ class PowerControl :
             "bg_color" : self.bg_color ,
             "text" : "Contrl"
             }
-        display.text(
-            font,
-            self.heading_2_display["text"] ,       # Heading
-            self.heading_2_display["xpos"] ,
-            self.heading_2_display["ypos"] ,
-            self.heading_2_display["color"] ,      # char color
-            self.heading_2_display["bg_color"]     # background color
-            )
         #
         #---- power level display set up
         self.power_level_display = {
             "xpos" : 110 ,
             "ypos" : 36 ,
             "color" : BLUE ,
-            "bg_color" : self.bg_color
+            "bg_color" : self.bg_color ,
+            "width" : 122 ,             # Clear area for the 3 digit string
+            "height" : 54 ,
+            "text" : ""                 # Last digits displayed
             }
         self.power_level_display["display"] = OLED7Segment (display,
                                                             color=self.power_level_display["color"])
@@ -456,14 +548,6 @@ class PowerControl :
             "power_on_color" : RED ,
             "power_off_color" : WHITE
             }
-        display.text(
-            font,
-            "Pow",                                # label
-            (self.power_on_display["xpos"] + self.power_on_display["size"] + 4) ,
-            self.power_on_display["ypos"] ,
-            self.power_on_display["color"] ,      # char color
-            self.power_on_display["bg_color"]     # background color
-            )
         #
         #---- standby display set up
         self.standby_display = {
@@ -473,6 +557,7 @@ class PowerControl :
             "bg_color" : YELLOW ,
             "color" : RED 
             }
+        self.display_headings ()
         #
         #---- initial power settings
         self.set_standby_off ()
@@ -482,40 +567,69 @@ class PowerControl :
             = self.poller.message_set ("powercontrol",
                                             {"power_level": 0 ,
                                             "last_update_ms": poller.get_current_time_ms ()})
-        self.new_power_level (self.power_level)
+        self.new_power_level (self.power_level_tenths)
+
+    def display_headings (self) :
+        # Static screen text, drawn once at start up
+        for heading_display in (self.power_heading_display ,
+                                self.heading_1_display ,
+                                self.heading_2_display) :
+            display.text(
+                font,
+                heading_display["text"] ,          # Heading
+                heading_display["xpos"] ,
+                heading_display["ypos"] ,
+                heading_display["color"] ,         # char color
+                heading_display["bg_color"]        # background color
+                )
+        display.text(
+            font,
+            "Pow",                                # label
+            (self.power_on_display["xpos"] + self.power_on_display["size"] + 4) ,
+            self.power_on_display["ypos"] ,
+            self.power_on_display["color"] ,      # char color
+            self.power_on_display["bg_color"]     # background color
+            )
 
+    @micropython.native
     def poll_it (self) :
         #print ("PowerControl: poll_it")
-        if self.last_update_ms != self.power_settings["last_update_ms"] :
-            self.last_update_ms = self.power_settings["last_update_ms"]
+        poller = self.poller
+        power_settings = self.power_settings
+        last_update_ms = power_settings["last_update_ms"]
+        if self.last_update_ms != last_update_ms :
+            self.last_update_ms = last_update_ms
             self.set_standby_off ()
-            #print (self.power_settings["power_level"], " ", self.power_level)
-            if self.power_settings["power_level"] != self.power_level :
-                self.new_power_level (self.power_settings["power_level"])
+            power_level_tenths = self.power_level_to_tenths (power_settings["power_level"])
+            #print (power_level_tenths, " ", self.power_level_tenths)
+            if power_level_tenths != self.power_level_tenths :
+                self.new_power_level (power_level_tenths)
+            else :
+                self.set_standby_deadline ()
             return
 
         # test for timeout here
-        current_time_ms = poller.get_current_time_ms ()
-        #print (self.last_update_ms, " ", current_time_ms)
-        #print ( time.ticks_diff (current_time_ms, self.last_update_ms))
-        if not self.standby :
-            if self.power_level > self.standby_power_level :
-                if time.ticks_diff (current_time_ms, self.last_update_ms) \
-                       > self.standby_timeout :
-                    self.set_standby_on ()
-                    #self.set_power_off ()
-                    return
+        standby_deadline_ms = self.standby_deadline_ms
+        if standby_deadline_ms is not None :
+            current_time_ms = poller.get_current_time_ms ()
+            #print (standby_deadline_ms, " ", current_time_ms)
+            if ticks_diff (current_time_ms, standby_deadline_ms) > 0 :
+                self.set_standby_on ()
+                #self.set_power_off ()
+                return
 
         if poller.active_now (self.change_ms) :
             #print ("power on/off")
             if self.power_on :
-                if self.off_ms > 0 :
+                off_ms = self.off_ms
+                if off_ms > 0 :
                     self.set_power_off ()
-                    self.change_ms = self.poller.active_next_ms (self.off_ms)
+                    self.change_ms = poller.active_next_ms (off_ms)
             else :
-                if self.on_ms > 0 :
+                on_ms = self.on_ms
+                if on_ms > 0 :
                     self.set_power_on ()
-                    self.change_ms = self.poller.active_next_ms (self.on_ms)
+                    self.change_ms = poller.active_next_ms (on_ms)
 
     def set_standby_on (self) :
         self.standby = True
@@ -528,8 +642,8 @@ class PowerControl :
             self.standby_display["bg_color"]     # background color
             )
         #self.power_settings["power_level"] = self.standby_power_level
-        #print ("===============", self.standby_power_level)
-        self.new_power_level (self.standby_power_level)
+        #print ("===============", self.standby_power_level_tenths)
+        self.new_power_level (self.standby_power_level_tenths)
     def set_standby_off (self) :
         if not self.standby :
             return
@@ -543,28 +657,20 @@ class PowerControl :
             self.bg_color                         # background color
             )
     
-    def new_power_level (self, power_level) :
+    def power_level_to_tenths (self, power_level) :
+        # 0.0 - 100.0 percent -> 0 - 1000
+        return max (0, min (1000, int (round (float (power_level) * 10))))
+
+    def new_power_level (self, power_level_tenths) :
         #print ("new_power_level: ",
-               #"New:" + "{:3.2f}".format (power_level) ,
-               #" Old:" + "{:3.2f}".format (self.power_level)
+               #"New:", power_level_tenths ,
+               #" Old:", self.power_level_tenths
                #)
-        power_increase = power_level > self.power_level
+        power_increase = power_level_tenths > self.power_level_tenths
         #self.power_settings["power_level"] = power_level
-        self.power_level = power_level
-        if power_level > 99.0 :         # Always on
-            self.on_ms = 999999
-            self.off_ms = 0
-        elif power_level >= 50.0 :      # On > Off
-            self.on_ms = int ((self.minimum_pulse_ms / ((100.0 - self.power_level) * 0.01))) \
-                                - self.minimum_pulse_ms
-            self.off_ms = self.minimum_pulse_ms
-        elif power_level >= 1.0 :       # Off > On
-            self.on_ms = self.minimum_pulse_ms
-            self.off_ms = int ((self.minimum_pulse_ms / (self.power_level * 0.01))) \
-                                - self.minimum_pulse_ms
-        else :                               # Always off
-            self.on_ms = 0
-            self.off_ms = 999999
+        self.power_level_tenths = power_level_tenths
+        self.on_ms = self.pulse_on_ms[power_level_tenths]
+        self.off_ms = self.pulse_off_ms[power_level_tenths]
         if power_increase :
             #print ("increase")
             self.change_ms = self.poller.active_next_ms (self.on_ms)
@@ -573,19 +679,56 @@ class PowerControl :
             #print ("decrease")
             self.change_ms = self.poller.active_next_ms (self.off_ms)
             self.set_power_off ()
+        self.set_standby_deadline ()
         self.display_power_level ()
         #print ("On:", self.on_ms, "Off:", self.off_ms)
+
+    def build_pulse_table (self) :
+        # On/Off milliseconds for each power level tenth, 0.0 - 100.0
+        self.pulse_on_ms = array ('I')
+        self.pulse_off_ms = array ('I')
+        for power_level_tenths in range (1001) :
+            power_level = power_level_tenths / 10
+            if power_level_tenths > 990 :          # Always on
+                on_ms = 999999
+                off_ms = 0
+            elif power_level_tenths >= 500 :       # On > Off
+                on_ms = int ((self.minimum_pulse_ms / ((100.0 - power_level) * 0.01))) \
+                                - self.minimum_pulse_ms
+                off_ms = self.minimum_pulse_ms
+            elif power_level_tenths >= 10 :        # Off > On
+                on_ms = self.minimum_pulse_ms
+                off_ms = int ((self.minimum_pulse_ms / (power_level * 0.01))) \
+                                - self.minimum_pulse_ms
+            else :                                 # Always off
+                on_ms = 0
+                off_ms = 999999
+            self.pulse_on_ms.append (on_ms)
+            self.pulse_off_ms.append (off_ms)
+
+    def set_standby_deadline (self) :
+        # Standby only applies above the standby power level
+        if self.power_level_tenths > self.standby_power_level_tenths :
+            self.standby_deadline_ms = ticks_add (self.last_update_ms,
+                                                  self.standby_timeout)
+        else :
+            self.standby_deadline_ms = None
         
     def display_power_level (self) :
-        display.fill_rect (self.power_level_display["xpos"] ,
-                            self.power_level_display["ypos"] ,
-                            122 ,
-                            54 ,
-                            #RED)
-                            self.power_level_display["bg_color"])
-        self.power_level_display["display"].display_string (self.power_level_display["xpos"] ,
-                                                           self.power_level_display["ypos"] ,
-                                                           "{:3d}".format (int (self.power_level)))
+        # Only redraw when the displayed digits change
+        power_level_display = self.power_level_display
+        text = "{:3d}".format (self.power_level_tenths // 10)
+        if text == power_level_display["text"] :
+            return
+        power_level_display["text"] = text
+        display.fill_rect (power_level_display["xpos"] ,
+                            power_level_display["ypos"] ,
+                            power_level_display["width"] ,
+                            power_level_display["height"] ,
+                            power_level_display["bg_color"])
+        power_level_display["display"].display_string (power_level_display["xpos"] ,
+                                                      power_level_display["ypos"] ,
+                                                      text)
 
     def set_power_on (self) :
         self.power_control_pin.on ()
@@ -606,7 +749,7 @@ class PowerControl :
 
     def shutdown (self) :
         #print ("PowerControl: set power off")
-        self.new_power_level (0.0)
+        self.new_power_level (0)
         display.text(
             font,
             "Power Off" ,                        # power off text
@@ -656,6 +799,14 @@ class PollIndicator:
         self.indicator_xpos = self.display_xpos + 5
         self.indicator_ypos = self.display_ypos + 10
         self.indicator_cycle = 0
+        #---- Prebuilt frames, [0] all segments, [1-4] indicator_cycle
+        self.indicator_frames = (
+            self.build_indicator_frame (True, True, True, True) ,
+            self.build_indicator_frame (True, False, False, True) ,
+            self.build_indicator_frame (True, True, False, False) ,
+            self.build_indicator_frame (False, True, True, False) ,
+            self.build_indicator_frame (False, False, True, True)
+            )
         display.fill_rect (self.display_xpos ,
                             self.display_ypos ,
                             self.size ,
@@ -663,72 +814,53 @@ class PollIndicator:
                             self.bg_color)
         self.poll_it ()
 
+    @micropython.native
     def poll_it (self) :
         #print ("PollIndicator: poll_it")
+        poller = self.poller
         if not poller.active_now (self.active_next_ms) :
             return
         #print ("PollIndicator: poll_it: change")
-        self.active_next_ms = self.poller.active_next_ms (self.active_interval_ms)
-        if self.indicator_cycle == 1 :
-            self.indicator_cycle = 2
-            self.left_segment (self.bg_color)
-            self.top_segment (self.color)
-            self.right_segment (self.color)
-        elif self.indicator_cycle == 2 :
-            self.indicator_cycle = 3
-            self.top_segment (self.bg_color)
-            self.right_segment (self.color)
-            self.bottom_segment (self.color)
-        elif self.indicator_cycle == 3 :
-            self.indicator_cycle = 4
-            self.right_segment (self.bg_color)
-            self.bottom_segment (self.color)
-            self.left_segment (self.color)
-        elif self.indicator_cycle == 4 :
-            self.indicator_cycle = 1
-            self.bottom_segment (self.bg_color)
-            self.left_segment (self.color)
-            self.top_segment (self.color)
+        self.active_next_ms = poller.active_next_ms (self.active_interval_ms)
+        indicator_cycle = self.indicator_cycle
+        if indicator_cycle == 0 :
+            frame = self.indicator_frames[0]
+            indicator_cycle = 1
         else :
-            self.indicator_cycle = 1
-            self.top_segment (self.color)
-            self.right_segment (self.color)
-            self.bottom_segment (self.color)
-            self.left_segment (self.color)
-        #print ("mem_free:", gc.mem_free())
-        #if gc.mem_free() < 50000 :
-            #gc.collect()
-
-    def top_segment (self, color) :
-        display.fill_rect (self.indicator_xpos ,
-                            self.indicator_ypos ,
-                            self.size ,
-                            self.width ,
-                            color)
-    def right_segment (self, color) :
-        display.fill_rect (self.indicator_xpos + (self.size - self.width) ,
-                            self.indicator_ypos ,
-                            self.width ,
-                            self.size ,
-                            color)
-    def bottom_segment (self, color) :
-        display.fill_rect (self.indicator_xpos ,
-                            self.indicator_ypos + (self.size - self.width) ,
-                            self.size ,
-                            self.width ,
-                            color)
-    def left_segment (self, color) :
-        display.fill_rect (self.indicator_xpos ,
-                            self.indicator_ypos ,
-                            self.width ,
-                            self.size ,
-                            color)
+            indicator_cycle = indicator_cycle % 4 + 1
+            frame = self.indicator_frames[indicator_cycle]
+        self.indicator_cycle = indicator_cycle
+        display.blit_buffer (frame ,
+                             self.indicator_xpos ,
+                             self.indicator_ypos ,
+                             self.size ,
+                             self.size)
+
+    def build_indicator_frame (self, top, right, bottom, left, color=None) :
+        # RGB565 frame, lit where a segment is on
+        if color is None :
+            color = self.color
+        frame = bytearray (BG_PIXEL * (self.size * self.size))
+        frame_buffer = framebuf.FrameBuffer (frame, self.size, self.size, framebuf.RGB565)
+        #---- framebuf stores pixels low byte first, read the panel bytes that way
+        color = int.from_bytes (rgb565_pixel (color), "little")
+        edge = self.size - self.width
+        if top :
+            frame_buffer.fill_rect (0, 0, self.size, self.width, color)
+        if right :
+            frame_buffer.fill_rect (edge, 0, self.width, self.size, color)
+        if bottom :
+            frame_buffer.fill_rect (0, edge, self.size, self.width, color)
+        if left :
+            frame_buffer.fill_rect (0, 0, self.width, self.size, color)
+        return frame
 
     def shutdown (self) :
-        self.top_segment (RED)
-        self.right_segment (RED)
-        self.bottom_segment (RED)
-        self.left_segment (RED)
+        display.blit_buffer (self.build_indicator_frame (True, True, True, True, RED) ,
+                             self.indicator_xpos ,
+                             self.indicator_ypos ,
+                             self.size ,
+                             self.size)
         
     def poll_it_alt (self) :
         #print ("PollIndicator: poll_it")
@@ -766,21 +898,21 @@ class ShutdownTimer:
                  hours = SHUTDOWN_HOURS ,
                  minutes = SHUTDOWN_MINUTES ,
                  seconds = SHUTDOWN_SECONDS) :
+        self.poller = poller
         self.run_ms = poller.hours_to_ms (hours) \
                            + poller.minutes_to_ms (minutes) \
                            + poller.seconds_to_ms (seconds)
+        #---- ticks_diff is only valid within half the ticks period (~6 days)
+        self.run_ms = min (self.run_ms, poller.hours_to_ms (6 * 24))
         self.start_time_ms = poller.get_current_time_ms ()
-        self.run_time_ms = self.start_time_ms
-        self.last_time_ms = self.start_time_ms
-        self.stop_time_ms = self.start_time_ms + self.run_ms
+        self.stop_time_ms = ticks_add (self.start_time_ms, self.run_ms)
 
+    @micropython.native
     def poll_it (self) :
         if self.run_ms <= 0 :
             return                   # Not set - exit
-        current_time_ms = poller.get_current_time_ms ()
-        self.run_time_ms += time.ticks_diff (current_time_ms, self.last_time_ms)
-        self.last_time_ms = current_time_ms
-        if self.run_time_ms >= self.stop_time_ms :
+        poller = self.poller
+        if ticks_diff (poller.get_current_time_ms (), self.stop_time_ms) >= 0 :
             poller.shutdown ()
 
     def shutdown (self) :
@@ -807,18 +939,45 @@ class Watchdog:
 
 # end Watchdog #
 
+#---------------------------------------------------------------------------
+# GarbageCollector - Collect on an allocation threshold, not by probing
+#---------------------------------------------------------------------------
+class GarbageCollector:
+
+    def __init__(self ,
+                 collect_ticks = GC_COLLECT_TICKS) :
+        #print ("GarbageCollector: init")
+        gc.collect ()
+        #---- Collect once another quarter of the free heap is allocated
+        gc.threshold (gc.mem_free () // 4 + gc.mem_alloc ())
+        self.collect_ticks = collect_ticks
+        self.tick_counter = 0
+
+    def poll_it (self) :
+        self.tick_counter += 1
+        if self.tick_counter >= self.collect_ticks :
+            self.tick_counter = 0
+            gc.collect ()          # Safety net
+            #print ("mem_free:", gc.mem_free())
+
+    def shutdown (self) :
+        pass
+
+# end GarbageCollector #
+
 #---------------------------------------------------------------------------
 # main
 #---------------------------------------------------------------------------
 
 if MACHINE_FREQ > 0 :
     machine.freq (MACHINE_FREQ)
-    print ("machine.freq:", machine.freq())
+    if DEBUG :
+        print ("machine.freq:", machine.freq())
 #----
 #---- Display set up
 #----
 spi = machine.SPI(1,
-                  baudrate=30000000 ,
+                  baudrate=SPI_BAUDRATE ,
                   polarity=1 ,
                   sck=machine.Pin(18) ,
                   mosi=machine.Pin(19))
@@ -859,6 +1018,7 @@ poller.poll_add (PollIndicator (poller ,       # Indicates polling
                                 color = GREEN))
 poller.poll_add (GetCommand (poller))
 poller.poll_add (PowerControl (poller))
+poller.poll_add (GarbageCollector ())          # Last, collects start up garbage
 
 #----
 #---- Start polling